@@ -1,11 +1,12 @@
 import cv2
 import pygame
 import numpy as np
-import math
 from enum import Enum
-from dataclasses import dataclass
-from typing import List, Tuple, Optional, Callable, Any, cast
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple, Optional, Callable, Any, cast
 import os
+import threading
+import time
 
 # 尝试导入 MediaPipe（在某些类型检查环境中可能无法静态解析）
 try:
@@ -18,9 +19,16 @@ except Exception:  # 运行时兜底：允许在无 mediapipe 环境下启动（
     mp_hands = None
     mp_drawing = None
 
-# 初始化pygame
-pygame.init()
-pygame.mixer.init()
+# 可选：Numba JIT 编译命中测试（未安装时以纯 Python 运行）
+try:
+    from numba import njit  # type: ignore[import-not-found]
+except Exception:
+    njit = None
+
+# 初始化pygame：此处只初始化显示与字体；pygame.init()（含混音器与计时器）延迟到生成音效时，
+# 避免导入时提前打开音频设备空转占用 CPU
+pygame.display.init()
+pygame.font.init()
 
 # 屏幕设置
 SCREEN_WIDTH = 1280
@@ -28,6 +36,9 @@ SCREEN_HEIGHT = 720
 screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 pygame.display.set_caption("虚拟钢琴")
 
+# 调试：在摄像头画面上绘制完整手部骨架（默认只画拇指指尖一个点，开销更小）
+DEBUG_SHOW_LANDMARKS = False
+
 # 颜色定义
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -39,6 +50,12 @@ GREEN = (100, 255, 150)
 RED = (255, 100, 100)
 YELLOW = (255, 255, 100)
 
+# 各 UI 状态对应的颜色，按 UIState.value - 1 索引（NORMAL, HOVER, ACTIVE）
+WHITE_KEY_COLORS = (WHITE, LIGHT_GRAY, GRAY)
+BLACK_KEY_COLORS = (BLACK, DARK_GRAY, GRAY)
+BUTTON_COLORS = (BLUE, GREEN, RED)
+SHEET_ITEM_COLORS = (LIGHT_GRAY, GREEN, RED)
+
 class UIState(Enum):
     NORMAL = 1
     HOVER = 2
@@ -57,7 +74,11 @@ class PianoKey:
     frequency: float
     rect: pygame.Rect
     is_black: bool
-    state: UIState = UIState.NORMAL
+    # 包围盒 (x1, y1, x2, y2)，命中测试用纯整数比较代替 Rect.collidepoint
+    bounds: Tuple[int, int, int, int] = field(init=False)
+
+    def __post_init__(self):
+        self.bounds = (self.rect.left, self.rect.top, self.rect.right, self.rect.bottom)
 
 @dataclass
 class Button:
@@ -66,17 +87,65 @@ class Button:
     rect: pygame.Rect
     state: UIState = UIState.NORMAL
     callback: Optional[Callable[[], None]] = None
+    # 预渲染的按钮文字及其居中位置，字体加载后由 build_button_labels 填充
+    label: Optional[Tuple[pygame.Surface, pygame.Rect]] = None
+    # 包围盒 (x1, y1, x2, y2)，命中测试用纯整数比较代替 Rect.collidepoint
+    bounds: Tuple[int, int, int, int] = field(init=False)
+
+    def __post_init__(self):
+        self.bounds = (self.rect.left, self.rect.top, self.rect.right, self.rect.bottom)
 
 @dataclass
 class Sheet:
     """乐谱数据类"""
     name: str
     notes: List[str]
+    # 每个音符在 piano_keys 中的下标，由 create_sheets 填充，避免运行时字符串比较
+    note_indices: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int8))
+
+def _hit_test_slots(bounds, white_slots, black_slots, x0: int, key_w: int, x: int, y: int) -> int:
+    """O(1) 命中测试：由 x 直接算出所在白键格，只检查相邻的黑键与该白键。
+    white_slots[w] 为第 w 个白键的琴键下标；black_slots[w] 为跨在第 w 与 w+1 个白键之间的黑键下标（无则 -1）。
+    黑键优先，返回琴键下标，未命中返回 -1。
+    参数既可为 NumPy 数组（numba 编译时）也可为列表（纯 Python 运行时，逐元素访问比 NumPy 标量快）。
+    """
+    if x < x0:
+        return -1
+    wi = (x - x0) // key_w
+    if wi >= len(white_slots):
+        return -1
+    # 位于第 wi 格时，可能压在上面的黑键只有格 wi 右侧与格 wi-1 右侧两个
+    for slot in (wi, wi - 1):
+        if slot >= 0:
+            k = black_slots[slot]
+            if k >= 0:
+                b = bounds[k]
+                if b[0] <= x < b[2] and b[1] <= y < b[3]:
+                    return int(k)
+    k = white_slots[wi]
+    b = bounds[k]
+    if b[0] <= x < b[2] and b[1] <= y < b[3]:
+        return int(k)
+    return -1
+
+hit_test_keys = njit(cache=True)(_hit_test_slots) if njit is not None else _hit_test_slots
 
 class VirtualPiano:
+    # 音效合成参数：时间轴与衰减包络对所有琴键相同，只计算一次
+    SAMPLE_RATE = 22050
+    NOTE_DURATION = 0.5
+    _SAMPLE_T = np.arange(int(SAMPLE_RATE * NOTE_DURATION), dtype=np.float32)
+    # 衰减包络增益表：已乘入音量 0.3 与 int16 满幅，合成时只需一次乘法
+    _ENVELOPE = (np.exp(-_SAMPLE_T / (SAMPLE_RATE * 0.3)) * 0.3 * 32767).astype(np.int16)
+    # 单周期正弦波表（长度为 2 的幂，取模可用位与），合成时查表代替逐样本 sin
+    WAVETABLE_SIZE = 2048
+    _WAVETABLE = np.sin(2 * np.pi * np.arange(WAVETABLE_SIZE, dtype=np.float32) / WAVETABLE_SIZE).astype(np.float32)
+    # 中文字体路径缓存：只在首次加载字体时查找一次
+    _font_path = None  # type: Optional[str]
+    _font_path_resolved = False
+
     def __init__(self):
         self.running = True
-        self.clock = pygame.time.Clock()
         self.mode = GameMode.NORMAL
         
         # MediaPipe手部检测
@@ -85,19 +154,57 @@ class VirtualPiano:
         self.hand_tracking_enabled = self.mp_hands is not None
         if self.hand_tracking_enabled:  # type: ignore[truthy-function]
             hands_mod = cast(Any, self.mp_hands)
+            # 偏向廉价的跟踪路径：提高检测阈值、降低跟踪阈值，减少手掌重新检测；
+            # 只用到拇指/食指指尖，轻量关键点模型（model_complexity=0）已足够
             self.hands = hands_mod.Hands(
                 static_image_mode=False,
                 max_num_hands=1,
-                min_detection_confidence=0.7,
-                min_tracking_confidence=0.5
+                model_complexity=0,
+                min_detection_confidence=0.8,
+                min_tracking_confidence=0.3
             )
         else:
             self.hands = None
+        # 识别输入尺寸：关键点为归一化坐标，缩小输入不影响映射，但推理更快
+        self.detect_size = (320, 240)
+        self._detect_buf = np.empty((self.detect_size[1], self.detect_size[0], 3), dtype=np.uint8)
+        # 静止帧跳过识别：与上次识别时的 32x32 灰度缩略图比较，最大像素差低于阈值则复用上次结果。
+        # 用最大值而非总和，捏合这类小范围动作也能及时触发重新识别
+        self.motion_thresh = 8
+        self._prev_small_gray = None  # type: Optional[np.ndarray]
+        self._last_results = None     # type: Any
+        # 识别节流：每 detect_interval 帧才运行一次识别，其余帧复用上次结果
+        self.detect_interval = 2
+        self._frame_count = 0
+        # 摄像头预览尺寸与复用的缩放/镜像缓冲区，避免每帧分配
+        cam_h = int(SCREEN_HEIGHT * 2/3) - 80
+        self._cam_size = (int(cam_h * 4/3), cam_h)
+        self._cam_small = np.empty((cam_h, self._cam_size[0], 3), dtype=np.uint8)
+        self._cam_buf = np.empty_like(self._cam_small)
+        # 预览 Surface 只创建一次并直接共享 _cam_buf 的内存（OpenCV 与 pygame 均为行优先布局，
+        # 'BGR' 格式需 pygame 2.1.3+），之后只需把新画面写入缓冲区
+        self._cam_surface = pygame.image.frombuffer(self._cam_buf, self._cam_size, 'BGR')
+        self._cam_pos = ((SCREEN_WIDTH - self._cam_size[0]) // 2, 80)
         
         # 摄像头
         self.cap = cv2.VideoCapture(0)
+        # MJPG 解码开销更低；须先于分辨率设置，部分后端（如 Windows DirectShow）切换格式后会忽略或重置分辨率
+        self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        # 只缓存 1 帧，避免驱动排队旧帧导致指针滞后
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        # 后台采集线程：读帧并完成手部识别，只保留最新的 (帧, 关键点)（旧帧直接丢弃），
+        # 让读帧、识别与主线程的界面更新/绘制并行
+        self._frame_lock = threading.Lock()
+        self._latest = None  # type: Optional[Tuple[np.ndarray, Any]]
+        self._new_frame = threading.Event()
+        # 主循环等待新帧的超时（秒），无新帧时仍能及时处理窗口事件
+        self.frame_wait_timeout = 1 / 30
+        # 采集线程中的异常，由主循环重新抛出，避免线程静默退出后画面冻结
+        self._capture_error = None  # type: Optional[BaseException]
+        self._capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self._capture_thread.start()
         
         # 手指位置和状态
         self.raw_finger_pos = None  # type: Optional[Tuple[int, int]]
@@ -113,6 +220,27 @@ class VirtualPiano:
         
         # 创建钢琴键
         self.piano_keys = self.create_piano_keys()
+        # 琴键热路径数据按列存放（SoA），下标与 piano_keys 一致：
+        # 包围盒 [left, top, right, bottom]、黑键标记、状态（UIState.value - 1）
+        self._key_bounds = np.array([k.bounds for k in self.piano_keys], dtype=np.int16)
+        self._key_is_black = np.array([k.is_black for k in self.piano_keys], dtype=bool)
+        self._key_states = np.zeros(len(self.piano_keys), dtype=np.int8)
+        # 绘制顺序：先白键后黑键
+        self._white_key_idx = np.flatnonzero(~self._key_is_black)
+        self._black_key_idx = np.flatnonzero(self._key_is_black)
+        # 按白键格建立的空间索引：白键按从左到右顺序创建；黑键中心位于其左侧白键的右边缘
+        self._white_slots = self._white_key_idx.astype(np.int16)
+        self._black_slots = np.full(len(self._white_slots), -1, dtype=np.int16)
+        for i in self._black_key_idx:
+            slot = (self.piano_keys[i].rect.centerx - self._white_start_x) // self._white_key_width - 1
+            self._black_slots[slot] = i
+        # 传给命中测试的表：numba 编译版直接用 NumPy 数组；纯 Python 运行时逐元素访问 NumPy 标量较慢，改用列表
+        if njit is not None:
+            self._hit_tables = (self._key_bounds, self._white_slots, self._black_slots)
+        else:
+            self._hit_tables = (self._key_bounds.tolist(), self._white_slots.tolist(), self._black_slots.tolist())
+        # 预先调用一次命中测试：安装 numba 时在启动阶段完成 JIT 编译，避免首次检测到手时卡顿
+        hit_test_keys(*self._hit_tables, self._white_start_x, self._white_key_width, -1, -1)
         
         # 创建按钮
         self.buttons = []
@@ -122,17 +250,34 @@ class VirtualPiano:
         self.sheets = self.create_sheets()
         self.current_sheet = None
         self.current_note_index = 0
+        self.current_key_index = -1  # 当前应按琴键的下标，-1 表示无
+        # 进度文字缓存：按 (乐谱名, 进度) 缓存，只在进度推进时渲染一次
+        self._progress_cache = {}  # type: Dict[Tuple[str, int], pygame.Surface]
         
         # 弹窗
         self.sheet_select_popup = None
         self.complete_popup_timer = 0
+        # 弹窗半透明遮罩只创建一次，并转换为屏幕像素格式，绘制时直接 blit 免去格式转换
+        self._dim_overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        self._dim_overlay.set_alpha(180)
+        self._dim_overlay.fill(BLACK)
         
         # 生成音效
         self.generate_sounds()
+        # 固定 8 个声道轮流发声，避免每次播放都向混音器申请空闲声道
+        self.num_voices = 8
+        pygame.mixer.set_num_channels(self.num_voices)
+        self._channels = [pygame.mixer.Channel(i) for i in range(self.num_voices)]
+        self._next_channel = 0
         
         # 字体：优先使用系统内的中文字体，避免中文显示为方块
         self.font = self._load_chinese_font(36)
         self.small_font = self._load_chinese_font(24)
+        # 静态文字（琴键名、按钮、弹窗标题等）渲染结果缓存，避免每帧重复光栅化
+        self._text_cache = {}  # type: Dict[Tuple[pygame.font.Font, str, Tuple[int, int, int]], pygame.Surface]
+        # 预渲染琴键外观与按钮文字（依赖字体，需在字体加载之后）
+        self.build_key_surfaces()
+        self.build_button_labels()
 
         # 指针映射参数：同时更容易到达顶部与底部（压缩中段）
         # 分段 gamma：上半区使用 >1（更容易到顶部），下半区使用 <1（更容易到底部）
@@ -140,13 +285,61 @@ class VirtualPiano:
         self.pointer_top_gamma = 1.8     # >1 顶部更易达
         self.pointer_bottom_gamma = 1.1  # <1 底部更易达（进一步增强）
 
-        # 捏合判定参数（拇指-食指指尖的归一化距离）
-        self.pinch_on_thresh = 0.065   # 小于此阈值视为捏合开始
+        # 捏合判定参数（拇指-食指指尖在图像平面内的归一化距离）
+        self.pinch_on_thresh = 0.055   # 小于此阈值视为捏合开始
         self.pinch_off_thresh = 0.080  # 大于此阈值视为捏合结束（迟滞避免抖动）
+        # 以平方距离比较，省去每帧开方
+        self._pinch_on_sq = self.pinch_on_thresh ** 2
+        self._pinch_off_sq = self.pinch_off_thresh ** 2
         self._pinch_active = False
 
-    def _load_chinese_font(self, size: int) -> pygame.font.Font:
-        """尝试加载常见中文字体，找不到则回退默认字体。
+    def _capture_loop(self):
+        """后台线程：持续读取摄像头并识别手部，覆盖写入最新 (帧, 关键点) 槽位"""
+        try:
+            while self.running:
+                ret, frame = self.cap.read()
+                if not ret:
+                    # 读取失败（如无摄像头）时稍作等待，避免空转占满 CPU
+                    time.sleep(0.01)
+                    continue
+                # 不再整帧镜像：指针坐标在 detect_hand 中按 1 - x 镜像，预览在缩小后再镜像
+                # OpenCV 与 MediaPipe 的 C++ 调用会释放 GIL，识别与主线程绘制可并行
+                hand_landmarks = self.infer_hand(frame)
+                with self._frame_lock:
+                    self._latest = (frame, hand_landmarks)
+                self._new_frame.set()
+        except Exception as e:
+            # 记录异常并唤醒主循环，由主线程抛出
+            self._capture_error = e
+            self._new_frame.set()
+
+    def read_latest_frame(self) -> Optional[Tuple[np.ndarray, Any]]:
+        """取走最新一帧及其手部关键点；自上次读取后没有新帧时返回 None"""
+        with self._frame_lock:
+            latest = self._latest
+            self._latest = None
+            self._new_frame.clear()
+        return latest
+
+    @classmethod
+    def _load_chinese_font(cls, size: int) -> pygame.font.Font:
+        """加载中文字体，找不到则回退默认字体。
+        字体路径只查找一次并缓存在类属性上，不同字号直接复用。
+        """
+        if not cls._font_path_resolved:
+            cls._font_path = cls._find_chinese_font_path()
+            cls._font_path_resolved = True
+        if cls._font_path is not None:
+            try:
+                return pygame.font.Font(cls._font_path, size)
+            except Exception:
+                pass
+        # 回退到默认字体
+        return pygame.font.Font(None, size)
+    
+    @staticmethod
+    def _find_chinese_font_path() -> Optional[str]:
+        """查找常见中文字体文件路径，找不到返回 None。
         Windows 常见：微软雅黑(Microsoft YaHei)、黑体(SimHei)、宋体(SimSun)、等线(DengXian)
         也尝试 Noto/Source Han 系列。
         """
@@ -165,7 +358,7 @@ class VirtualPiano:
                 if name in available:
                     path = pygame.font.match_font(name)
                     if path:
-                        return pygame.font.Font(path, size)
+                        return path
             # 常见 Windows 字体文件路径兜底
             win_font_paths = [
                 r"C:\\Windows\\Fonts\\msyh.ttc",
@@ -179,11 +372,19 @@ class VirtualPiano:
             ]
             for p in win_font_paths:
                 if os.path.exists(p):
-                    return pygame.font.Font(p, size)
+                    return p
         except Exception:
             pass
-        # 回退到默认字体
-        return pygame.font.Font(None, size)
+        return None
+    
+    def render_text(self, font: pygame.font.Font, text: str, color: Tuple[int, int, int]) -> pygame.Surface:
+        """渲染不变的文字并缓存结果，同一 (字体, 文本, 颜色) 只光栅化一次"""
+        cache_key = (font, text, color)
+        surface = self._text_cache.get(cache_key)
+        if surface is None:
+            surface = font.render(text, True, color)
+            self._text_cache[cache_key] = surface
+        return surface
     
     def create_piano_keys(self) -> List[PianoKey]:
         """创建钢琴键（一个八度）"""
@@ -216,6 +417,9 @@ class VirtualPiano:
         # 先创建白键
         white_keys_count = sum(1 for _, _, is_black in notes_data if not is_black)
         start_x = (SCREEN_WIDTH - white_keys_count * white_key_width) // 2
+        # 记录白键格几何信息，供 O(1) 命中测试使用
+        self._white_start_x = start_x
+        self._white_key_width = white_key_width
         
         white_index = 0
         for note, freq, is_black in notes_data:
@@ -278,60 +482,99 @@ class VirtualPiano:
     
     def create_sheets(self) -> List[Sheet]:
         """创建乐谱"""
-        return [
+        sheets = [
             Sheet("小星星", ["C4", "C4", "G4", "G4", "A4", "A4", "G4", 
                           "F4", "F4", "E4", "E4", "D4", "D4", "C4"]),
             Sheet("欢乐颂", ["E4", "E4", "F4", "G4", "G4", "F4", "E4", "D4",
                           "C4", "C4", "D4", "E4", "E4", "D4", "D4"]),
             Sheet("简单练习", ["C4", "D4", "E4", "F4", "G4", "A4", "B4", "C5"]),
         ]
+        # 音符名 -> 琴键下标
+        key_index = {key.note: i for i, key in enumerate(self.piano_keys)}
+        for sheet in sheets:
+            sheet.note_indices = np.array([key_index[n] for n in sheet.notes], dtype=np.int8)
+        return sheets
     
     def generate_sounds(self):
-        """生成钢琴音效"""
-        self.sounds = {}
-        sample_rate = 22050
-        duration = 0.5
-        
-        for key in self.piano_keys:
-            samples = np.sin(2 * np.pi * np.arange(sample_rate * duration) * key.frequency / sample_rate)
-            # 添加衰减效果
-            envelope = np.exp(-np.arange(sample_rate * duration) / (sample_rate * 0.3))
-            samples = samples * envelope * 0.3
-            samples = (samples * 32767).astype(np.int16)
-            
-            # 创建立体声
-            stereo_samples = np.column_stack((samples, samples))
-            sound = pygame.sndarray.make_sound(stereo_samples)
-            self.sounds[key.note] = sound
+        """生成钢琴音效（所有琴键一次性批量合成），按 piano_keys 下标存放"""
+        self.sounds = []  # type: List[pygame.mixer.Sound]
+        sr = self.SAMPLE_RATE
+        # 混音器使用单声道，采样率与音效合成一致；allowedchanges=0 禁止设备自行改用其它
+        # 采样率/声道数（由 SDL 负责转换），下方按原始 int16 单声道缓冲区创建的音效才能正确播放
+        pygame.mixer.pre_init(frequency=sr, size=-16, channels=1, buffer=512, allowedchanges=0)
+        # 必须调用 pygame.init()：除混音器外还会初始化 SDL 计时器，
+        # 否则 pygame.time.get_ticks() 恒为 0，点击锁定与完成弹窗计时都会失效
+        pygame.init()
+        
+        # (N_keys, N_samples) 波表下标矩阵，float32 减半内存带宽
+        # 波表步长预先乘入频率向量，并尽量原地运算，减少整块临时数组
+        freqs = np.array([k.frequency for k in self.piano_keys], dtype=np.float32)
+        steps = freqs * np.float32(self.WAVETABLE_SIZE / sr)
+        table_idx = np.outer(steps, self._SAMPLE_T).astype(np.int32)
+        table_idx &= self.WAVETABLE_SIZE - 1
+        # 添加衰减效果
+        waves = self._WAVETABLE[table_idx]
+        waves *= self._ENVELOPE
+        tones = waves.astype(np.int16)
+        
+        # 混音器为单声道 int16，每个琴键取一行（连续缓冲区）直接作为原始采样数据，
+        # 绕过 sndarray 的数组转换层
+        for samples in tones:
+            self.sounds.append(pygame.mixer.Sound(buffer=samples))
+    
+    def infer_hand(self, frame) -> Any:
+        """运行手部识别（在采集线程中调用），返回第一只手的关键点；未检测到或未启用时返回 None"""
+        if not self.hand_tracking_enabled or self.hands is None:
+            return None
+        self._frame_count += 1
+        if self._last_results is None or self._frame_count % self.detect_interval == 0:
+            small = cv2.resize(frame, self.detect_size, dst=self._detect_buf, interpolation=cv2.INTER_AREA)
+            gray = cv2.cvtColor(cv2.resize(small, (32, 32), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+            moved = (
+                self._prev_small_gray is None
+                or int(cv2.absdiff(gray, self._prev_small_gray).max()) >= self.motion_thresh
+            )
+            if moved or self._last_results is None:
+                # 只在重新识别时更新参考图，缓慢漂移累积到阈值后也会触发识别
+                self._prev_small_gray = gray
+                frame_rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+                # 标记为只读，MediaPipe 可直接引用而无需内部复制（关键点绘制在 BGR 原帧上）
+                frame_rgb.flags.writeable = False
+                self._last_results = self.hands.process(frame_rgb)
+        results = self._last_results
+        if results.multi_hand_landmarks:
+            return results.multi_hand_landmarks[0]
+        return None
     
-    def detect_hand(self, frame):
-        """检测手部并获取手指位置"""
+    def detect_hand(self, frame, hand_landmarks):
+        """根据识别出的手部关键点获取手指位置与捏合状态，并在画面上绘制关键点"""
         if not self.hand_tracking_enabled or self.hands is None:
             # 未启用手势检测时，直接返回原始帧
             self.finger_pos = None
             self.is_finger_bent = False
             self.prev_finger_bent = False
             return frame
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(frame_rgb)
         
         self.finger_pos = None
         self.is_finger_bent = False
         
-        if results.multi_hand_landmarks:
-            hand_landmarks = results.multi_hand_landmarks[0]
+        if hand_landmarks is not None:
+            # 取拇指与食指的指尖（landmark 4 与 8）：只读这两个点的坐标为浮点数，
+            # 不遍历全部 21 个关键点
+            h, w, _ = frame.shape
+            landmarks = hand_landmarks.landmark
+            thumb_tip = landmarks[4]
+            index_tip = landmarks[8]
+            thumb_x, thumb_y = thumb_tip.x, thumb_tip.y
             
-            # 绘制手部关键点（若可用）
-            if self.mp_draw is not None and self.mp_hands is not None:
+            # 绘制手部关键点：预览画面很小，默认只在拇指指尖画一个点（原始帧坐标，预览时统一镜像）
+            if DEBUG_SHOW_LANDMARKS and self.mp_draw is not None and self.mp_hands is not None:
                 self.mp_draw.draw_landmarks(frame, hand_landmarks, self.mp_hands.HAND_CONNECTIONS)
-            
-            # 取拇指与食指的指尖（landmark 4 与 8）
-            h, w, _ = frame.shape
-            thumb_tip = hand_landmarks.landmark[4]
-            index_tip = hand_landmarks.landmark[8]
-            # 使用拇指指尖作为指针位置
-            x_screen = int(thumb_tip.x * SCREEN_WIDTH)
-            y_norm = thumb_tip.y
+            else:
+                cv2.circle(frame, (int(thumb_x * w), int(thumb_y * h)), 5, (0, 255, 0), -1)
+            # 使用拇指指尖作为指针位置（原始帧未镜像，x 取 1 - x 得到镜像坐标）
+            x_screen = int((1.0 - thumb_x) * SCREEN_WIDTH)
+            y_norm = thumb_y
             if y_norm < 0.0:
                 y_norm = 0.0
             elif y_norm > 1.0:
@@ -346,28 +589,24 @@ class VirtualPiano:
             x_screen = max(0, min(SCREEN_WIDTH - 1, x_screen))
             y_screen = max(0, min(SCREEN_HEIGHT - 1, y_screen))
             self.raw_finger_pos = (x_screen, y_screen)
-            # 指针平滑与死区
-            if self.finger_pos is None:
-                self.finger_pos = (float(x_screen), float(y_screen))
-            else:
-                px, py = cast(Tuple[float, float], self.finger_pos)
-                dx = x_screen - px
-                dy = y_screen - py
-                if dx * dx + dy * dy >= self.finger_deadzone * self.finger_deadzone:
-                    a = self.finger_smooth_alpha
-                    self.finger_pos = (px * (1 - a) + x_screen * a, py * (1 - a) + y_screen * a)
+            # 指针平滑与死区：首次出现时以当前位置为起点；位移未超过死区时系数为 0（保持不动）
+            px, py = self.finger_pos or (x_screen, y_screen)
+            dx = x_screen - px
+            dy = y_screen - py
+            a = self.finger_smooth_alpha if dx * dx + dy * dy >= self.finger_deadzone * self.finger_deadzone else 0.0
+            self.finger_pos = (px + a * dx, py + a * dy)
             
-            # 检测捏合（拇指与食指指尖的距离）
-            dx = thumb_tip.x - index_tip.x
-            dy = thumb_tip.y - index_tip.y
-            dz = thumb_tip.z - index_tip.z
-            dist = math.sqrt(dx*dx + dy*dy + dz*dz)
+            # 检测捏合（拇指与食指指尖的距离，与是否镜像无关）；
+            # MediaPipe 的 z 噪声大且非度量深度，只用 x/y 平面距离
+            pdx = thumb_x - index_tip.x
+            pdy = thumb_y - index_tip.y
+            dist_sq = pdx * pdx + pdy * pdy
             # 迟滞：进入阈值与退出阈值不同，减少抖动
             if self._pinch_active:
-                if dist >= self.pinch_off_thresh:
+                if dist_sq >= self._pinch_off_sq:
                     self._pinch_active = False
             else:
-                if dist <= self.pinch_on_thresh:
+                if dist_sq <= self._pinch_on_sq:
                     self._pinch_active = True
             # 复用点击逻辑中的布尔量名，保持其余流程不变
             self.is_finger_bent = self._pinch_active
@@ -420,9 +659,11 @@ class VirtualPiano:
             active_buttons = []
         
         # 更新按钮状态（仅在当前模式有效的按钮）
+        hit_pos = self.get_hit_pos()
+        hx, hy = hit_pos if hit_pos else (-1, -1)
         for btn in active_buttons:
-            hit_pos = self.get_hit_pos()
-            if hit_pos and btn.rect.collidepoint(hit_pos):
+            x1, y1, x2, y2 = btn.bounds
+            if hit_pos and x1 <= hx < x2 and y1 <= hy < y2:
                 if clicked:
                     btn.state = UIState.ACTIVE
                     if btn.callback:
@@ -434,117 +675,98 @@ class VirtualPiano:
         
         # 更新钢琴键状态（黑键优先，避免与白键重叠区域同时触发）
         if self.mode in [GameMode.NORMAL, GameMode.SHEET_PLAY]:
-            target_key: Optional[PianoKey] = None
-            hit_pos = self.get_hit_pos()
+            target_index = -1
             if hit_pos:
-                # 先查黑键
-                for key in self.piano_keys:
-                    if key.is_black and key.rect.collidepoint(hit_pos):
-                        target_key = key
-                        break
-                # 再查白键（仅当未命中黑键时）
-                if target_key is None:
-                    for key in self.piano_keys:
-                        if not key.is_black and key.rect.collidepoint(hit_pos):
-                            target_key = key
-                            break
+                target_index = int(hit_test_keys(
+                    *self._hit_tables, self._white_start_x, self._white_key_width, hx, hy
+                ))
 
-            for key in self.piano_keys:
-                if key is target_key:
-                    if clicked:
-                        key.state = UIState.ACTIVE
-                        self.play_note(key.note)
-                    else:
-                        key.state = UIState.HOVER
+            self._key_states.fill(UIState.NORMAL.value - 1)
+            if target_index >= 0:
+                if clicked:
+                    self._key_states[target_index] = UIState.ACTIVE.value - 1
+                    self.play_note(target_index)
                 else:
-                    key.state = UIState.NORMAL
+                    self._key_states[target_index] = UIState.HOVER.value - 1
     
-    def play_note(self, note: str):
-        """播放音符"""
-        if note in self.sounds:
-            self.sounds[note].play()
-            
-            # 乐谱模式下检查是否正确
-            if self.mode == GameMode.SHEET_PLAY and self.current_sheet:
-                if self.current_note_index < len(self.current_sheet.notes):
-                    if note == self.current_sheet.notes[self.current_note_index]:
-                        self.current_note_index += 1
-                        
-                        # 检查是否完成
-                        if self.current_note_index >= len(self.current_sheet.notes):
-                            self.mode = GameMode.COMPLETE
-                            self.complete_popup_timer = pygame.time.get_ticks()
-    
-    def draw_piano_keys(self):
-        """绘制钢琴键"""
-        # 先绘制白键
-        for key in self.piano_keys:
-            if not key.is_black:
-                self.draw_key(key)
+    def play_note(self, key_index: int):
+        """播放音符（key_index 为 piano_keys 下标）"""
+        self._channels[self._next_channel].play(self.sounds[key_index])
+        self._next_channel = (self._next_channel + 1) % self.num_voices
         
-        # 再绘制黑键（在上层）
-        for key in self.piano_keys:
-            if key.is_black:
-                self.draw_key(key)
+        # 乐谱模式下检查是否正确
+        if self.mode == GameMode.SHEET_PLAY and self.current_sheet:
+            if key_index == self.current_key_index:
+                self.current_note_index += 1
+                self.update_current_key()
+                
+                # 检查是否完成
+                if self.current_note_index >= len(self.current_sheet.notes):
+                    self.mode = GameMode.COMPLETE
+                    self.complete_popup_timer = pygame.time.get_ticks()
     
-    def draw_key(self, key: PianoKey):
-        """绘制单个钢琴键"""
-        # 根据状态选择颜色
-        if key.is_black:
-            colors = {
-                UIState.NORMAL: BLACK,
-                UIState.HOVER: DARK_GRAY,
-                UIState.ACTIVE: GRAY
-            }
+    def update_current_key(self):
+        """根据乐谱进度更新当前应按琴键的下标"""
+        sheet = self.current_sheet
+        if sheet is not None and self.current_note_index < len(sheet.note_indices):
+            self.current_key_index = int(sheet.note_indices[self.current_note_index])
         else:
-            colors = {
-                UIState.NORMAL: WHITE,
-                UIState.HOVER: LIGHT_GRAY,
-                UIState.ACTIVE: GRAY
-            }
-        
-        color = colors[key.state]
-        pygame.draw.rect(screen, color, key.rect)
-        pygame.draw.rect(screen, BLACK, key.rect, 2)
-        
+            self.current_key_index = -1
+    
+    def build_key_surfaces(self):
+        """预渲染每个琴键在各状态（NORMAL/HOVER/ACTIVE）下的外观，边框与音符名一并烘焙"""
+        self._key_surfaces = []  # type: List[Tuple[pygame.Surface, ...]]
+        for key in self.piano_keys:
+            colors = BLACK_KEY_COLORS if key.is_black else WHITE_KEY_COLORS
+            text_color = WHITE if key.is_black else BLACK
+            text = self.render_text(self.small_font, key.note, text_color)
+            variants = []
+            for color in colors:
+                surface = pygame.Surface(key.rect.size).convert()
+                local_rect = surface.get_rect()
+                pygame.draw.rect(surface, color, local_rect)
+                pygame.draw.rect(surface, BLACK, local_rect, 2)
+                # 绘制音符名称
+                surface.blit(text, text.get_rect(center=(local_rect.centerx, local_rect.bottom - 20)))
+                variants.append(surface)
+            self._key_surfaces.append(tuple(variants))
+    
+    def build_button_labels(self):
+        """预渲染所有按钮文字，并计算居中后的绘制位置"""
+        for btn in self.normal_buttons + self.sheet_mode_buttons:
+            text = self.render_text(self.small_font, btn.text, WHITE)
+            btn.label = (text, text.get_rect(center=btn.rect.center))
+    
+    def draw_piano_keys(self):
+        """绘制钢琴键：按状态批量 blit 预渲染的琴键外观"""
         # 乐谱模式下高亮当前应该按的键
-        if self.mode == GameMode.SHEET_PLAY and self.current_sheet:
-            if self.current_note_index < len(self.current_sheet.notes):
-                if key.note == self.current_sheet.notes[self.current_note_index]:
-                    pygame.draw.rect(screen, YELLOW, key.rect, 5)
-        
-        # 绘制音符名称
-        text_color = WHITE if key.is_black else BLACK
-        text = self.small_font.render(key.note, True, text_color)
-        text_rect = text.get_rect(center=(key.rect.centerx, key.rect.bottom - 20))
-        screen.blit(text, text_rect)
+        highlight = self.current_key_index if self.mode == GameMode.SHEET_PLAY else -1
+        
+        # 先绘制白键，再绘制黑键（在上层）；高亮框需在同层绘制，避免压住黑键
+        for key_idx in (self._white_key_idx, self._black_key_idx):
+            screen.blits(
+                [(self._key_surfaces[i][self._key_states[i]], self.piano_keys[i].rect) for i in key_idx],
+                doreturn=False
+            )
+            if highlight >= 0 and highlight in key_idx:
+                pygame.draw.rect(screen, YELLOW, self.piano_keys[highlight].rect, 5)
     
     def draw_button(self, btn: Button):
         """绘制按钮"""
-        colors = {
-            UIState.NORMAL: BLUE,
-            UIState.HOVER: GREEN,
-            UIState.ACTIVE: RED
-        }
-        
-        color = colors[btn.state]
+        color = BUTTON_COLORS[btn.state.value - 1]
         pygame.draw.rect(screen, color, btn.rect, border_radius=5)
         pygame.draw.rect(screen, WHITE, btn.rect, 2, border_radius=5)
         
-        text = self.small_font.render(btn.text, True, WHITE)
-        text_rect = text.get_rect(center=btn.rect.center)
-        screen.blit(text, text_rect)
+        if btn.label is not None:
+            screen.blit(*btn.label)
     
     def draw_camera_feed(self, frame):
         """绘制摄像头画面"""
-        camera_height = int(SCREEN_HEIGHT * 2/3) - 80
-        frame = cv2.resize(frame, (int(camera_height * 4/3), camera_height))
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        # 不再旋转90度，而是交换轴以匹配 pygame 的 Surface 期望维度
-        surface_array = np.transpose(frame, (1, 0, 2))  # (w, h, 3)
-        surface = pygame.surfarray.make_surface(surface_array)
-        x = (SCREEN_WIDTH - surface.get_width()) // 2
-        screen.blit(surface, (x, 80))
+        cv2.resize(frame, self._cam_size, dst=self._cam_small)
+        # 在缩小后的预览上做水平镜像，代价远小于整帧翻转
+        cv2.flip(self._cam_small, 1, dst=self._cam_buf)
+        # _cam_surface 与 _cam_buf 共享内存，写入后直接绘制
+        screen.blit(self._cam_surface, self._cam_pos)
 
     def draw_finger_pointer(self):
         """在最上层绘制手指指针"""
@@ -556,10 +778,7 @@ class VirtualPiano:
     def draw_sheet_select_popup(self):
         """绘制乐谱选择弹窗"""
         # 半透明背景
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.set_alpha(180)
-        overlay.fill(BLACK)
-        screen.blit(overlay, (0, 0))
+        screen.blit(self._dim_overlay, (0, 0))
         
         # 弹窗背景
         popup_width = 400
@@ -574,7 +793,7 @@ class VirtualPiano:
         pygame.draw.rect(screen, BLUE, popup_rect, 3, border_radius=10)
         
         # 标题
-        title = self.font.render("选择乐谱", True, BLACK)
+        title = self.render_text(self.font, "选择乐谱", BLACK)
         title_rect = title.get_rect(center=(SCREEN_WIDTH // 2, popup_rect.top + 40))
         screen.blit(title, title_rect)
         
@@ -585,17 +804,16 @@ class VirtualPiano:
         # 在弹窗内部独立计算点击边沿，避免被其他 UI 先行消耗
         clicked = self.check_click()
 
+        item_x = popup_rect.left + 20
+        item_width = popup_width - 40
+        fx, fy = self.finger_pos if self.finger_pos else (-1.0, -1.0)
         for i, sheet in enumerate(self.sheets):
-            item_rect = pygame.Rect(
-                popup_rect.left + 20,
-                start_y + i * (item_height + 10),
-                popup_width - 40,
-                item_height
-            )
+            item_y = start_y + i * (item_height + 10)
+            item_rect = pygame.Rect(item_x, item_y, item_width, item_height)
             
             # 检测悬停和点击
             state = UIState.NORMAL
-            if self.finger_pos and item_rect.collidepoint(self.finger_pos):
+            if self.finger_pos and item_x <= fx < item_x + item_width and item_y <= fy < item_y + item_height:
                 if clicked:
                     state = UIState.ACTIVE
                     self.select_sheet(sheet)
@@ -603,24 +821,16 @@ class VirtualPiano:
                     state = UIState.HOVER
             
             # 绘制选项
-            colors = {
-                UIState.NORMAL: LIGHT_GRAY,
-                UIState.HOVER: GREEN,
-                UIState.ACTIVE: RED
-            }
-            pygame.draw.rect(screen, colors[state], item_rect, border_radius=5)
+            pygame.draw.rect(screen, SHEET_ITEM_COLORS[state.value - 1], item_rect, border_radius=5)
             pygame.draw.rect(screen, BLACK, item_rect, 2, border_radius=5)
             
-            text = self.small_font.render(sheet.name, True, BLACK)
+            text = self.render_text(self.small_font, sheet.name, BLACK)
             text_rect = text.get_rect(center=item_rect.center)
             screen.blit(text, text_rect)
     
     def draw_complete_popup(self):
         """绘制完成弹窗"""
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.set_alpha(180)
-        overlay.fill(BLACK)
-        screen.blit(overlay, (0, 0))
+        screen.blit(self._dim_overlay, (0, 0))
         
         popup_width = 400
         popup_height = 200
@@ -633,11 +843,11 @@ class VirtualPiano:
         pygame.draw.rect(screen, WHITE, popup_rect, border_radius=10)
         pygame.draw.rect(screen, GREEN, popup_rect, 3, border_radius=10)
         
-        title = self.font.render("恭喜！", True, GREEN)
+        title = self.render_text(self.font, "恭喜！", GREEN)
         title_rect = title.get_rect(center=(SCREEN_WIDTH // 2, popup_rect.centery - 30))
         screen.blit(title, title_rect)
         
-        msg = self.small_font.render("弹奏完成！", True, BLACK)
+        msg = self.render_text(self.small_font, "弹奏完成！", BLACK)
         msg_rect = msg.get_rect(center=(SCREEN_WIDTH // 2, popup_rect.centery + 20))
         screen.blit(msg, msg_rect)
     
@@ -654,6 +864,7 @@ class VirtualPiano:
         """选择乐谱"""
         self.current_sheet = sheet
         self.current_note_index = 0
+        self.update_current_key()
         self.mode = GameMode.SHEET_PLAY
     
     def exit_sheet_mode(self):
@@ -661,19 +872,38 @@ class VirtualPiano:
         self.mode = GameMode.NORMAL
         self.current_sheet = None
         self.current_note_index = 0
+        self.current_key_index = -1
+        self._progress_cache.clear()
     
     def run(self):
+        """运行主循环，退出（包括异常）时清理资源"""
+        try:
+            self._main_loop()
+        finally:
+            # 清理：先停止并等待采集线程完全退出，再释放其使用的摄像头与识别器
+            self.running = False
+            self._capture_thread.join()
+            self.cap.release()
+            if self.hands is not None:
+                self.hands.close()
+            pygame.mixer.quit()
+            pygame.quit()
+
+    def _main_loop(self):
         """主循环"""
         while self.running:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     self.running = False
             
-            # 读取摄像头
-            ret, frame = self.cap.read()
-            if ret:
-                frame = cv2.flip(frame, 1)
-                frame = self.detect_hand(frame)
+            # 读取摄像头与识别结果（由后台线程完成）：等待新帧到达，没有新帧则不重绘
+            self._new_frame.wait(self.frame_wait_timeout)
+            if self._capture_error is not None:
+                raise RuntimeError("摄像头采集线程异常退出") from self._capture_error
+            latest = self.read_latest_frame()
+            if latest is not None:
+                frame, hand_landmarks = latest
+                frame = self.detect_hand(frame, hand_landmarks)
                 
                 # 更新UI状态
                 self.update_ui_states()
@@ -694,8 +924,12 @@ class VirtualPiano:
                     
                     # 显示进度
                     if self.current_sheet:
-                        progress_text = f"{self.current_sheet.name}: {self.current_note_index}/{len(self.current_sheet.notes)}"
-                        text = self.small_font.render(progress_text, True, WHITE)
+                        progress_key = (self.current_sheet.name, self.current_note_index)
+                        text = self._progress_cache.get(progress_key)
+                        if text is None:
+                            progress_text = f"{self.current_sheet.name}: {self.current_note_index}/{len(self.current_sheet.notes)}"
+                            text = self.small_font.render(progress_text, True, WHITE)
+                            self._progress_cache[progress_key] = text
                         screen.blit(text, (SCREEN_WIDTH // 2 - 100, 40))
                 
                 # 绘制钢琴键
@@ -715,13 +949,6 @@ class VirtualPiano:
                 self.draw_finger_pointer()
                 
                 pygame.display.flip()
-                self.clock.tick(30)
-        
-        # 清理
-        self.cap.release()
-        if self.hands is not None:
-            self.hands.close()
-        pygame.quit()
 
 if __name__ == "__main__":
     game = VirtualPiano()